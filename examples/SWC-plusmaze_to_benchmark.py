@@ -10,7 +10,10 @@ organised in the pose benchmarks dataset structure.
 # %%
 # Imports
 # -------
+import errno
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import sleap_io as sio
@@ -29,6 +32,97 @@ from poseinterface.io import annotations_to_coco
 #
 # In this example, we convert the DLC annotations to COCO .json format.
 
+# %%
+# Define a fast file copy helper
+# ------------------------------
+# The source data lives on a networked filesystem, so we copy files with
+# :func:`os.copy_file_range` where available. This lets the kernel (or the
+# file server) move the data directly, without bouncing it through a
+# userspace buffer. We fall back to :func:`shutil.copyfile` on platforms or
+# filesystems that don't support it (on Linux, this still copies in-kernel
+# with :func:`os.sendfile`), and copy the metadata afterwards as
+# :func:`shutil.copy2` would.
+
+# Errors signalling that copy_file_range is unsupported for a given pair
+# of files (e.g. across filesystems), in which case we fall back to shutil
+_COPY_FILE_RANGE_FALLBACK_ERRNOS = {
+    errno.ENOSYS,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+}
+
+
+def _copy_file_range(src: str | Path, dst: str | Path) -> None:
+    """Copy a file's contents with in-kernel ``os.copy_file_range`` calls."""
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            while offset < size:
+                copied = os.copy_file_range(
+                    src_fd,
+                    dst_fd,
+                    size - offset,
+                    offset_src=offset,
+                    offset_dst=offset,
+                )
+                if copied == 0:
+                    # Some filesystems report success without copying
+                    raise OSError(errno.EINVAL, "copy_file_range copied 0 B")
+                offset += copied
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def _fast_copy(src: str | Path, dst: str | Path) -> None:
+    """Copy a file's contents and metadata, in-kernel where possible."""
+    # Truncating the target would empty the source if they are the same file
+    # (e.g. hard links), so refuse to copy as shutil does
+    try:
+        same_file = os.path.samefile(src, dst)
+    except OSError:  # the target doesn't exist yet
+        same_file = False
+    if same_file:
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(src, dst)
+        except OSError as e:
+            if e.errno not in _COPY_FILE_RANGE_FALLBACK_ERRNOS:
+                raise
+            shutil.copyfile(src, dst)
+    else:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+
+# Errors signalling that a hard link is not possible for a given pair of
+# files, in which case we copy instead. Other errors, such as the target
+# already existing (possibly as a link to the source), are raised.
+_LINK_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EMLINK,
+    errno.EOPNOTSUPP,
+}
+
+
+def _link_or_copy(src: str | Path, dst: str | Path) -> None:
+    """Hard-link a file if possible, otherwise copy it."""
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in _LINK_FALLBACK_ERRNOS:
+            raise
+        _fast_copy(src, dst)
+
+
 # %%
 # Define source and target directories
 # ------------------------------------
@@ -71,7 +165,7 @@ target_session_dir.mkdir(parents=True, exist_ok=True)
 # Copy video to target location
 target_video_path = target_session_dir / f"{video_id}.mp4"
 if not target_video_path.exists():
-    shutil.copy2(source_video_path, target_video_path)
+    _fast_copy(source_video_path, target_video_path)
     print(f"Copied video to: {target_video_path}")
 else:
     print(f"Video already exists at: {target_video_path}")
@@ -108,34 +202,45 @@ target_annotations_path = target_frames_dir / f"{video_id}_framelabels.json"
 # Load annotations to get the order of labeled frames
 labels = sio.load_file(source_annotations_path)
 
-# Build list of new filenames matching the order of labeled frames
-coco_image_filenames = []
-for lf in labels.labeled_frames:
-    # Extract the original image path from the labeled frame
-    # For DLC, video.filename is a list of all image paths;
-    # use frame_idx to get the correct one for this labeled frame
-    filename = lf.video.filename
-    if isinstance(filename, list):
-        filename = filename[lf.frame_idx]
-    original_path = Path(filename)
-    # Extract frame number from filename, e.g. "img0042.png" -> "0042"
-    frame_number = original_path.stem.replace("img", "")
-    # Create new filename following the naming convention
-    new_filename = f"{video_id}_frame-{frame_number}.png"
-    coco_image_filenames.append(new_filename)
+# Extract the original image paths from the (single) video
+# For DLC, video.filename is a list of all image paths;
+# use frame_idx to get the correct one for each labeled frame.
+# If there are no labeled frames (e.g. if the image paths in the csv file
+# are malformed), we leave the list empty and let annotations_to_coco
+# raise an informative error below.
+original_filenames = []
+if labels.labeled_frames:
+    video_filename = labels.labeled_frames[0].video.filename
+    if isinstance(video_filename, list):
+        original_filenames = [
+            video_filename[lf.frame_idx] for lf in labels.labeled_frames
+        ]
+    else:
+        original_filenames = [video_filename] * len(labels.labeled_frames)
+
+# Build list of new filenames matching the order of labeled frames,
+# following the naming convention.
+# The frame number is extracted from the filename by slicing,
+# e.g. "img0042.png" -> "0042"
+coco_image_filenames = [
+    f"{video_id}_frame-{os.path.basename(filename)[3:-4]}.png"
+    for filename in original_filenames
+]
 
 # %%
 # Convert DLC annotations to COCO format
 # --------------------------------------
 # Here we use the :func:`annotations_to_coco` function from `poseinterface.io`
 # which wraps around `sleap_io` functionality to perform the conversion.
-# We pass the new filenames so the JSON references the renamed frames.
+# We pass the new filenames so the JSON references the renamed frames,
+# and the already loaded labels so the DLC csv file is not parsed again.
 
 annotations_to_coco(
     input_path=source_annotations_path,
     output_json_path=target_annotations_path,
     coco_image_filenames=coco_image_filenames,
     coco_visibility_encoding="ternary",
+    labels=labels,
 )
 print(f"Saved COCO annotations to: {target_annotations_path}")
 
@@ -145,15 +250,50 @@ print(f"Saved COCO annotations to: {target_annotations_path}")
 # Copy the frames used for labeling and rename them to follow
 # the naming convention:
 # ``sub-{subjectID}_ses-{SessionID}_view-{ViewID}_frame-{FrameID}.png``
+#
+# Copying many small files over a network filesystem is latency-bound,
+# so we first collect the frames that still need copying and then copy them
+# concurrently with a thread pool. The copies are I/O-bound and release the
+# GIL, so threads keep several requests in flight at once.
+#
+# The labeled frames are never modified, so if the source and target
+# directories are on the same filesystem we hard-link the frames instead of
+# copying them. The video is always copied, so that changes to the target
+# video can never propagate back to the source data.
+
+with os.scandir(source_labels_dir) as entries:
+    # List the directory once, without a stat or Path object per entry
+    source_frames = [e for e in entries if e.name.endswith(".png")]
 
-for source_frame_path in source_labels_dir.glob("*.png"):
+# List the frames already in the target directory once, rather than
+# checking whether each target frame exists with a separate stat call
+existing_frame_names = set(os.listdir(target_frames_dir))
+
+# Build the target paths as plain strings from a common prefix,
+# rather than joining a new Path object per frame
+target_frames_dir_prefix = os.fspath(target_frames_dir) + os.sep
+target_frame_name_prefix = f"{video_id}_frame-"
+
+source_frame_paths = []
+target_frame_paths = []
+for source_frame in source_frames:
     # Extract frame number from original filename, e.g. "img0042.png" -> "0042"
-    frame_number = source_frame_path.stem.replace("img", "")
-    target_frame_path = (
-        target_frames_dir / f"{video_id}_frame-{frame_number}.png"
-    )
-    if not target_frame_path.exists():
-        shutil.copy2(source_frame_path, target_frame_path)
+    frame_number = source_frame.name[3:-4]
+    target_frame_name = target_frame_name_prefix + frame_number + ".png"
+    if target_frame_name not in existing_frame_names:
+        source_frame_paths.append(source_frame.path)
+        target_frame_paths.append(target_frames_dir_prefix + target_frame_name)
+
+# Hard links only work within a filesystem, so check this once for the
+# pair of directories rather than attempting a link per frame
+same_device = (
+    os.stat(source_labels_dir).st_dev == os.stat(target_frames_dir).st_dev
+)
+copy_frame = _link_or_copy if same_device else _fast_copy
+
+with ThreadPoolExecutor(max_workers=16) as executor:
+    # Consume the results so that any copy error is raised here
+    list(executor.map(copy_frame, source_frame_paths, target_frame_paths))
 
 print(f"Copied labeled frames to: {target_frames_dir}")
 
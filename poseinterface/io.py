@@ -1,12 +1,25 @@
-import copy
 import json
+import os
 import re
+import threading
+from collections.abc import Iterator
 from pathlib import Path
+from queue import Queue
 
 import sleap_io as sio
 from sleap_io.io import coco
 from sleap_io.io.dlc import is_dlc_file
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional, faster JSON encoder
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack  # type: ignore[import-untyped]
+except ImportError:  # msgpack is only needed for binary sidecar files
+    msgpack = None  # type: ignore[assignment]
+
 _EMPTY_LABELS_ERROR_MSG = {
     "default": (
         "No annotations could be extracted from the input file. "
@@ -21,7 +34,22 @@ _EMPTY_LABELS_ERROR_MSG = {
     ),
 }
 
-POSEINTERFACE_FRAME_REGEXP = r"frame-(\d+)"
+POSEINTERFACE_FRAME_REGEXP = re.compile(r"frame-(\d+)")
+
+# COCO dicts with fewer annotations than this are encoded in full and
+# written at once, rather than streamed to the output file
+_MAX_ANNOTATIONS_SINGLE_WRITE = 100
+
+# Approximate size in bytes of the blocks of encoded JSON that are written
+# to the output file when streaming, and maximum number of encoded blocks
+# waiting to be written
+_WRITE_BLOCK_SIZE = 1 << 20
+_MAX_PENDING_WRITE_BLOCKS = 4
+
+# Minimum size in bytes of encoded JSON written before the remaining blocks
+# are handed to a background writer thread. Below this, the cost of starting
+# the thread outweighs the overlap of encoding and writing.
+_MIN_THREADED_WRITE_SIZE = 10 << 20
 
 
 def annotations_to_coco(
@@ -30,6 +58,8 @@ def annotations_to_coco(
     *,
     coco_image_filenames: str | list[str] | None = None,
     coco_visibility_encoding: str = "ternary",
+    labels: sio.Labels | None = None,
+    binary_sidecar: bool = False,
 ) -> Path:
     """Export annotations file from a single video to ``poseinterface`` format.
 
@@ -50,6 +80,18 @@ def annotations_to_coco(
         JSON file. Options are "ternary" (0: not labeled, 1: labeled
         but not visible, 2: labeled and visible) or "binary" (0: not
         visible, 1: visible). Default is "ternary".
+    labels : sleap_io.Labels | None, optional
+        Annotations already loaded from ``input_path``, e.g. with
+        :func:`sleap_io.load_file`. If provided, they are used as they are
+        and the input file is not loaded again. If None (default), the
+        annotations are loaded from ``input_path``.
+    binary_sidecar : bool, optional
+        If True, also save the COCO annotations in MessagePack format,
+        next to the output JSON file and with the same name but a
+        ``.msgpack`` extension. This binary file is smaller and faster to
+        load than the JSON file, and requires the ``msgpack`` package
+        (``pip install poseinterface[msgpack]``).
+        Default is False.
 
     Returns
     -------
@@ -62,6 +104,11 @@ def annotations_to_coco(
     on its extension. See :func:`sleap_io.io.main.load_file` for supported
     formats.
 
+    The output JSON file is written with ``orjson`` if it is installed,
+    which is considerably faster than the standard library ``json`` module
+    for large annotation files. It can be installed with
+    ``pip install poseinterface[fast]``.
+
     See Also
     --------
     sleap_io.io.coco.convert_labels
@@ -76,12 +123,19 @@ def annotations_to_coco(
     ...     output_json_path=Path("path/to/annotations_coco.json"),
     ... )
     """
-    labels = sio.load_file(input_path)
+    if binary_sidecar and msgpack is None:
+        raise ImportError(
+            "Saving a binary sidecar file requires the msgpack package. "
+            "Please install it with `pip install poseinterface[msgpack]`."
+        )
+
+    if labels is None:
+        labels = sio.load_file(input_path)
 
     # Check if labels object is empty
     if len(labels.labeled_frames) == 0:
         error_msg = _EMPTY_LABELS_ERROR_MSG["default"]
-        if is_dlc_file(input_path):
+        if _maybe_dlc_file(input_path):
             error_msg += _EMPTY_LABELS_ERROR_MSG["dlc"]
         raise ValueError(error_msg)
 
@@ -106,35 +160,226 @@ def annotations_to_coco(
     # coco_data = _update_image_ids(coco_data)
 
     # Save JSON file
-    with open(output_json_path, "w") as f:
-        json.dump(coco_data, f)
+    _save_json(coco_data, output_json_path)
+
+    # Save binary sidecar file
+    if binary_sidecar:
+        _write_bytes(
+            Path(output_json_path).with_suffix(".msgpack"),
+            msgpack.packb(coco_data, use_bin_type=True, default=_to_builtin),
+        )
 
     return output_json_path
 
 
+def _maybe_dlc_file(input_path: Path) -> bool:
+    """Check if the input file is a DLC file, skipping non-CSV files.
+
+    DLC annotations files are CSV files, so files with any other extension
+    are ruled out before their contents are inspected.
+    """
+    if Path(input_path).suffix.lower() != ".csv":
+        return False
+    return is_dlc_file(input_path)
+
+
+def _save_json(data: dict, output_json_path: Path) -> None:
+    """Save a dict as compact JSON, using ``orjson`` if it is installed.
+
+    Small COCO dicts are encoded in full and written with a single system
+    call. Otherwise, top-level list values (e.g. the COCO images and
+    annotations) are encoded and written one item at a time, so that the
+    encoded file is never held in memory in full. Top-level values may
+    also be iterators (e.g. generators) of items, which are always
+    streamed, so that the items need not be held in memory either. Once
+    more than about 10 MB have been written, the remaining blocks are
+    written from a background thread while the next ones are encoded.
+    """
+    has_iterators = any(isinstance(v, Iterator) for v in data.values())
+    if (
+        not has_iterators
+        and len(data.get("annotations", ())) < _MAX_ANNOTATIONS_SINGLE_WRITE
+    ):
+        _write_bytes(output_json_path, _json_dumps(data))
+        return
+
+    fd = _open_for_writing(output_json_path)
+    try:
+        # Write the first blocks synchronously, and only start a writer
+        # thread for the rest once the output is large enough to benefit
+        blocks = _iter_json_blocks(data)
+        written = 0
+        for block in blocks:
+            _write_all(fd, block)
+            written += len(block)
+            if written >= _MIN_THREADED_WRITE_SIZE:
+                _write_blocks_threaded(fd, blocks)
+                break
+    finally:
+        os.close(fd)
+
+
+def _iter_json_blocks(data: dict) -> Iterator[bytearray]:
+    """Encode a dict as compact JSON, in blocks of about 1 MiB.
+
+    The encoded chunks are accumulated in a buffer, so that each block is
+    written to the file with a single system call.
+    """
+    block = bytearray()
+    for chunk in _iter_json_chunks(data):
+        block += chunk
+        if len(block) >= _WRITE_BLOCK_SIZE:
+            yield block
+            block = bytearray()
+    if block:
+        yield block
+
+
+def _write_blocks_threaded(fd: int, blocks: Iterator[bytearray]) -> None:
+    """Write blocks of bytes to a file descriptor from a background thread.
+
+    Encoding the blocks holds the GIL but writing them to the file releases
+    it, so writing each block in a background thread overlaps it with
+    encoding the next ones.
+    """
+    queue: Queue[bytearray | None] = Queue(maxsize=_MAX_PENDING_WRITE_BLOCKS)
+    errors: list[BaseException] = []
+
+    def write_blocks() -> None:
+        # Keep draining the queue after an error, so the producer never
+        # blocks on a full queue
+        while (block := queue.get()) is not None:
+            if not errors:
+                try:
+                    _write_all(fd, block)
+                except BaseException as e:
+                    errors.append(e)
+
+    writer = threading.Thread(target=write_blocks, daemon=True)
+    writer.start()
+    try:
+        for block in blocks:
+            if errors:
+                break
+            queue.put(block)
+    finally:
+        queue.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+
+def _iter_json_chunks(data: dict) -> Iterator[bytes]:
+    """Encode a dict as compact JSON, one top-level list item at a time.
+
+    Top-level iterators are encoded as JSON arrays of their items.
+    """
+    yield b"{"
+    for i, (key, value) in enumerate(data.items()):
+        if i > 0:
+            yield b","
+        yield _json_dumps(key) + b":"
+        if isinstance(value, list | Iterator):
+            yield b"["
+            for j, item in enumerate(value):
+                if j > 0:
+                    yield b","
+                yield _json_dumps(item)
+            yield b"]"
+        else:
+            yield _json_dumps(value)
+    yield b"}"
+
+
+def _write_bytes(output_path: Path, payload: bytes) -> None:
+    """Write bytes to a file directly, bypassing Python's file objects."""
+    fd = _open_for_writing(output_path)
+    try:
+        _write_all(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def _open_for_writing(output_path: Path) -> int:
+    """Open a file for writing in binary mode and return its descriptor."""
+    return os.open(
+        output_path,
+        os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+        0o666,
+    )
+
+
+def _write_all(fd: int, payload: bytes | bytearray) -> None:
+    """Write all bytes to a file descriptor, retrying partial writes."""
+    view = memoryview(payload)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _json_dumps(obj: object) -> bytes:
+    """Encode an object as compact UTF-8 JSON.
+
+    NumPy arrays and scalars are encoded as the equivalent lists and
+    numbers, and non-string dict keys are converted to strings, with or
+    without ``orjson``.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_to_builtin,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        obj, separators=(",", ":"), ensure_ascii=False, default=_to_builtin
+    ).encode("utf-8")
+
+
+def _to_builtin(obj: object) -> object:
+    """Convert NumPy arrays and scalars to Python lists and numbers.
+
+    Used as the fallback for objects the encoders cannot serialize.
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
 def _update_image_ids(input_data: dict) -> dict:
     """Assigns new image IDs based on the frame number in the filename."""
-    # Create new dict
-    data = copy.deepcopy(input_data)
+    # Create new dict, copying only the image and annotation dicts whose
+    # IDs are updated (nested data such as keypoints is shared, not copied)
+    data = {
+        **input_data,
+        "images": [dict(img) for img in input_data["images"]],
+        "annotations": [dict(annot) for annot in input_data["annotations"]],
+    }
 
-    # Build map old-to-new image IDs and update image id in images list
-    old_to_new_id = {}
-    for img in data["images"]:
-        # map old image_id to new image_id
-        old_img_id = img["id"]
-        new_img_id = _extract_frame_number(img["file_name"])
-        old_to_new_id[old_img_id] = new_img_id
+    # Extract new image IDs from the frame number in each filename,
+    # matching the default regexp inline and only deferring to
+    # _extract_frame_number to raise an error if there is no match
+    search = POSEINTERFACE_FRAME_REGEXP.search
+    new_img_ids = [
+        int(match.group(1))
+        if (match := search(img["file_name"])) is not None
+        else _extract_frame_number(img["file_name"])
+        for img in data["images"]
+    ]
 
-        # update image_id in images list
+    # Build map old-to-new image IDs and update image id in images list,
+    # checking the new image IDs are unique as we go
+    old_to_new_id = {}
+    seen_img_ids = set()
+    for img, new_img_id in zip(data["images"], new_img_ids, strict=True):
+        if new_img_id in seen_img_ids:
+            raise ValueError(
+                "Extracted image IDs are not unique. Please check that the "
+                "frame numbers as specified in the filename are unique "
+                f"(duplicate frame number {new_img_id} in {img['file_name']})."
+            )
+        seen_img_ids.add(new_img_id)
+        old_to_new_id[img["id"]] = new_img_id
         img["id"] = new_img_id
 
-    # Check new image IDs are unique
-    if len(old_to_new_id) != len(set(old_to_new_id.values())):
-        raise ValueError(
-            "Extracted image IDs are not unique. Please check that the frame "
-            "numbers as specified in the filename are unique."
-        )
-
     # Update image_id in annotations list
     for annot in data["annotations"]:
         annot["image_id"] = old_to_new_id[annot["image_id"]]
@@ -143,18 +388,24 @@ def _update_image_ids(input_data: dict) -> dict:
 
 
 def _extract_frame_number(
-    filename: str, frame_regexp: str = POSEINTERFACE_FRAME_REGEXP
+    filename: str,
+    frame_regexp: str | re.Pattern[str] = POSEINTERFACE_FRAME_REGEXP,
 ) -> int | None:
     """Extract the frame number in the input filename.
 
-    If no frame number is found, returns None.
+    The regexp may be given as a string or as a compiled pattern.
+    If no frame number is found, a ValueError is raised.
     """
-    match = re.search(frame_regexp, filename)
+    if isinstance(frame_regexp, re.Pattern):
+        pattern = frame_regexp
+    else:
+        pattern = re.compile(frame_regexp)
+    match = pattern.search(filename)
     if match is None:
         raise ValueError(
             "No frame number could be extracted from filename "
             f"{filename}. Please check that the filename contains a "
             "frame number matching the provided regexp pattern "
-            rf"'{frame_regexp}'."
+            rf"'{pattern.pattern}'."
         )
     return int(match.group(1))
@@ -5,7 +5,6 @@ from pathlib import Path
 from typing import Literal, TypedDict
 
 import pytest
-from PIL import Image
 
 # Path to the directory containing the test data
 TEST_DATA_DIR = Path(__file__).parent / "data"
@@ -48,10 +47,16 @@ DLC_TEST_PROJECT_FILES: dict[str, DLCTestFile] = {
 }
 
 
+# Bytes of a minimal valid PNG file (1x1 transparent RGBA pixel)
+DUMMY_FRAME_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000b4944415478da636000020000050001e9fadcd80000000049454e44ae426082"
+)
+
+
 def create_dummy_frame(path: Path) -> None:
     """Create a minimal valid PNG file (1x1 transparent pixel)."""
-    img = Image.new("RGBA", (1, 1), (0, 0, 0, 0))
-    img.save(path, "PNG")
+    path.write_bytes(DUMMY_FRAME_PNG)
 
 
 def create_dlc_project(
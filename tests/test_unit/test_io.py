@@ -1,13 +1,17 @@
+import json
+from contextlib import nullcontext
 from unittest.mock import patch
 
+import numpy as np
 import pytest
-from pytest_lazy_fixtures import lf
 
 from poseinterface.io import (
     _EMPTY_LABELS_ERROR_MSG,
     POSEINTERFACE_FRAME_REGEXP,
     _extract_frame_number,
+    _save_json,
     _update_image_ids,
+    _write_blocks_threaded,
     annotations_to_coco,
 )
 
@@ -45,15 +49,98 @@ def test_annotations_to_coco(
     assert output_path.exists()
 
 
+@patch("poseinterface.io.coco.convert_labels")
+@patch("poseinterface.io.sio.load_file")
+def test_annotations_to_coco_preloaded_labels(
+    mock_load_file,
+    mock_convert_labels,
+    tmp_path,
+):
+    """Test that preloaded labels are used without reloading the file."""
+    # Mock preloaded labels
+    mock_labels = mock_load_file.return_value
+    mock_labels.labeled_frames = [1]  # non-empty
+
+    # Mock return value of convert_labels
+    mock_convert_labels.return_value = {"images": [], "annotations": []}
+
+    # Run function to test
+    input_csv = tmp_path / "input.csv"
+    output_path = tmp_path / "output.json"
+    annotations_to_coco(input_csv, output_path, labels=mock_labels)
+
+    # Check input file is not loaded and preloaded labels are converted
+    mock_load_file.assert_not_called()
+    mock_convert_labels.assert_called_once_with(
+        mock_labels,
+        image_filenames=None,
+        visibility_encoding="ternary",
+    )
+    assert output_path.exists()
+
+
+@patch("poseinterface.io.coco.convert_labels")
+@patch("poseinterface.io.sio.load_file")
+def test_annotations_to_coco_binary_sidecar(
+    mock_load_file,
+    mock_convert_labels,
+    tmp_path,
+):
+    """Test that a MessagePack sidecar file is saved next to the JSON file."""
+    msgpack = pytest.importorskip("msgpack")
+
+    # Mock return value of load_file
+    mock_labels = mock_load_file.return_value
+    mock_labels.labeled_frames = [1]  # non-empty
+
+    # Mock return value of convert_labels
+    coco_data = {
+        "images": [{"id": 0, "file_name": "frame-0000.png"}],
+        "annotations": [{"id": 1, "image_id": 0, "keypoints": [1.5, 2, 2]}],
+    }
+    mock_convert_labels.return_value = coco_data
+
+    # Run function to test
+    output_path = tmp_path / "output.json"
+    result = annotations_to_coco(
+        tmp_path / "input.csv", output_path, binary_sidecar=True
+    )
+
+    # Check the JSON file path is returned and the sidecar matches it
+    assert result == output_path
+    sidecar_path = tmp_path / "output.msgpack"
+    assert msgpack.unpackb(sidecar_path.read_bytes()) == coco_data
+
+
+@patch("poseinterface.io.msgpack", None)
+@patch("poseinterface.io.sio.load_file")
+def test_annotations_to_coco_binary_sidecar_no_msgpack(
+    mock_load_file,
+    tmp_path,
+):
+    """Test that an error is raised if msgpack is needed but missing."""
+    with pytest.raises(ImportError, match="requires the msgpack package"):
+        annotations_to_coco(
+            tmp_path / "input.csv",
+            tmp_path / "output.json",
+            binary_sidecar=True,
+        )
+
+    # Check nothing was loaded or saved
+    mock_load_file.assert_not_called()
+    assert not (tmp_path / "output.json").exists()
+
+
 @patch("poseinterface.io.sio.load_file")
 @patch("poseinterface.io.is_dlc_file")
 @pytest.mark.parametrize(
     "input_file, error_message",
     [
         ("foo.csv", "default"),
-        (lf("dlc_single_index_in_project_root"), "dlc"),
-        (lf("dlc_multi_index_in_project_root"), "dlc"),
+        ("dlc_single_index_in_project_root", "dlc"),
+        ("dlc_multi_index_in_project_root", "dlc"),
     ],
+    ids=["default_csv", "dlc_single", "dlc_multi"],
 )
 def test_annotations_to_coco_invalid(
     mock_load_file,
@@ -61,7 +148,12 @@ def test_annotations_to_coco_invalid(
     input_file,
     error_message,
     tmp_path,
+    request,
 ):
+    # Get the path to the mock DLC project if a fixture name is given
+    if input_file.startswith("dlc_"):
+        input_file = request.getfixturevalue(input_file)
+
     # Mock return value of load_file to have empty
     # labeled frames
     mock_labels = mock_load_file.return_value
@@ -80,6 +172,30 @@ def test_annotations_to_coco_invalid(
     mock_is_dlc_file.assert_called_once_with(input_file)
 
 
+@patch("poseinterface.io.is_dlc_file")
+@patch("poseinterface.io.sio.load_file")
+def test_annotations_to_coco_invalid_not_csv(
+    mock_load_file,
+    mock_is_dlc_file,
+    tmp_path,
+):
+    """Test that DLC detection is skipped for non-CSV empty input files."""
+    # Mock return value of load_file to have empty labeled frames
+    mock_labels = mock_load_file.return_value
+    mock_labels.labeled_frames = []  # empty
+
+    # Check error is raised without the DLC hint
+    with pytest.raises(ValueError) as excinfo:
+        annotations_to_coco(
+            tmp_path / "input.slp",
+            tmp_path / "output.json",
+        )
+    assert str(excinfo.value) == _EMPTY_LABELS_ERROR_MSG["default"]
+
+    # Check the file was not inspected for DLC format
+    mock_is_dlc_file.assert_not_called()
+
+
 @patch("poseinterface.io.sio.load_file")
 def test_annotations_to_coco_not_single_video(
     mock_load_file,
@@ -102,6 +218,135 @@ def test_annotations_to_coco_not_single_video(
         )
 
 
+@pytest.mark.parametrize("write_mode", ["single", "streamed", "threaded"])
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_save_json(use_orjson, write_mode, tmp_path):
+    """Test that the JSON file is the same with and without orjson,
+    and whether it is written at once, streamed, or streamed and partly
+    written from a background thread.
+    """
+    if use_orjson:
+        pytest.importorskip("orjson")
+    data = {
+        "info": {"description": "test"},
+        "images": [
+            {"id": 0, "file_name": "frame-0000.png"},
+            {"id": 1, "file_name": "frame-0001.png"},
+        ],
+        "annotations": [{"id": 1, "image_id": 0, "keypoints": [1.5, 2, 2]}],
+        "categories": [{"id": 1, "name": "mouse-ñ"}],
+        "licenses": [],
+    }
+    output_path = tmp_path / "output.json"
+
+    # Hide orjson and/or force streaming (in several blocks, the later ones
+    # written from a background thread), as required
+    max_annotations_single_write = 100 if write_mode == "single" else 0
+    min_threaded_write_size = 32 if write_mode == "threaded" else 10 << 20
+    no_orjson = (
+        nullcontext() if use_orjson else patch("poseinterface.io.orjson", None)
+    )
+    with (
+        patch(
+            "poseinterface.io._MAX_ANNOTATIONS_SINGLE_WRITE",
+            max_annotations_single_write,
+        ),
+        patch("poseinterface.io._WRITE_BLOCK_SIZE", 16),
+        patch(
+            "poseinterface.io._MIN_THREADED_WRITE_SIZE",
+            min_threaded_write_size,
+        ),
+        no_orjson,
+        patch(
+            "poseinterface.io._write_blocks_threaded",
+            wraps=_write_blocks_threaded,
+        ) as mock_write_blocks_threaded,
+    ):
+        _save_json(data, output_path)
+
+    assert mock_write_blocks_threaded.called == (write_mode == "threaded")
+
+    with open(output_path, encoding="utf-8") as f:
+        assert json.load(f) == data
+
+
+def test_save_json_iterators(tmp_path):
+    """Test that top-level iterators are saved as JSON arrays."""
+    images = [{"id": i, "file_name": f"frame-{i:04d}.png"} for i in range(3)]
+    annotations = [{"id": i, "image_id": i} for i in range(3)]
+    data = {
+        "images": iter(images),
+        "annotations": (annot for annot in annotations),
+        "categories": [{"id": 1, "name": "mouse"}],
+    }
+    output_path = tmp_path / "output.json"
+
+    _save_json(data, output_path)
+
+    with open(output_path, encoding="utf-8") as f:
+        assert json.load(f) == {
+            "images": images,
+            "annotations": annotations,
+            "categories": [{"id": 1, "name": "mouse"}],
+        }
+
+
+def test_write_blocks_threaded_error():
+    """Test that errors writing in the background thread are raised."""
+    # Write more blocks than can be pending at once
+    blocks = (bytearray(b"x") for _ in range(20))
+    with (
+        patch("poseinterface.io._write_all", side_effect=OSError("disk full")),
+        pytest.raises(OSError, match="disk full"),
+    ):
+        _write_blocks_threaded(-1, blocks)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_save_json_numpy(use_orjson, tmp_path):
+    """Test that NumPy arrays and scalars are saved as lists and numbers,
+    and non-string keys as strings, with and without orjson.
+    """
+    if use_orjson:
+        pytest.importorskip("orjson")
+    data = {
+        "images": [{"id": np.int64(0), "file_name": "frame-0000.png"}],
+        "annotations": [
+            {
+                "id": 1,
+                "image_id": 0,
+                "keypoints": np.array([1.5, 2.0, 2.0]),
+                # non-C-contiguous and Fortran-ordered arrays
+                "bbox": np.arange(12.0).reshape(3, 4)[:, :2],
+                "segmentation": np.asfortranarray([[1, 2], [3, 4]]),
+                "attributes": {1: "a"},
+            }
+        ],
+    }
+    output_path = tmp_path / "output.json"
+
+    no_orjson = (
+        nullcontext() if use_orjson else patch("poseinterface.io.orjson", None)
+    )
+    with no_orjson:
+        _save_json(data, output_path)
+
+    with open(output_path, encoding="utf-8") as f:
+        assert json.load(f) == {
+            "images": [{"id": 0, "file_name": "frame-0000.png"}],
+            "annotations": [
+                {
+                    "id": 1,
+                    "image_id": 0,
+                    "keypoints": [1.5, 2.0, 2.0],
+                    "bbox": [[0.0, 1.0], [4.0, 5.0], [8.0, 9.0]],
+                    "segmentation": [[1, 2], [3, 4]],
+                    "attributes": {"1": "a"},
+                }
+            ],
+        }
+
+
 def test_update_image_ids():
     """Test that image ids are updated based on frame number."""
     # Define a COCO data dict with minimal info
@@ -159,6 +404,22 @@ def test_update_image_ids_duplicate_ids():
         _update_image_ids(data)
 
 
+def test_update_image_ids_no_frame_number():
+    """Test that a filename without frame number raises ValueError."""
+    data = {
+        "images": [
+            {"id": 1, "file_name": "frame-0005.png"},
+            {"id": 2, "file_name": "img0006.png"},  # no "frame-" prefix
+        ],
+        "annotations": [],
+    }
+
+    with pytest.raises(
+        ValueError, match="No frame number could be extracted from filename"
+    ):
+        _update_image_ids(data)
+
+
 @pytest.mark.parametrize(
     "filename, frame_regexp, expected_image_id",
     [
@@ -173,6 +434,14 @@ def test_update_image_ids_duplicate_ids():
         ("frame-0234", POSEINTERFACE_FRAME_REGEXP, 234),
         ("frame-0234abcd", POSEINTERFACE_FRAME_REGEXP, 234),
     ],
+    ids=[
+        "img_no_zero",
+        "img_zero",
+        "compound",
+        "no_ext",
+        "leading_zero",
+        "trailing",
+    ],
 )
 def test_extract_frame_number(filename, frame_regexp, expected_image_id):
     """Test that image id is correctly extracted from filename."""